@@ -6,9 +6,17 @@ Novel Converter - TXT to EPUB Converter
 
 import sys
 import os
+import codecs
 import traceback
-import glob
 import json
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import orjson  # 可选依赖，解析大型 metadata.json 更快
+except ImportError:
+    orjson = None
 
 # -----------------------------------------------------------------
 # 1. 设置 Python 路径
@@ -33,14 +41,20 @@ except ImportError:
 # -----------------------------------------------------------------
 # 3. 导入青龙通知
 # -----------------------------------------------------------------
-try:
-    from notify import send
-    logger.info("成功导入青龙 [notify] 通知模块。")
-except ImportError:
+def _fallback_send(title, content):
+    logger.warning(f"无法发送通知 (notify.py 缺失): {title}")
+
+send = _fallback_send
+if importlib.util.find_spec('notify') is None:
+    # 先检查模块是否存在，避免在常见的 "未放置 notify.py" 场景下抛出并回溯 ImportError
     logger.warning("notify.py 导入失败，将无法发送青龙通知。")
-    def send(title, content):
-        logger.warning(f"无法发送通知 (notify.py 缺失): {title}")
-        pass
+else:
+    try:
+        from notify import send
+        logger.info("成功导入青龙 [notify] 通知模块。")
+    except ImportError as e:
+        # notify.py 存在但其依赖缺失
+        logger.warning(f"notify.py 导入失败，将无法发送青龙通知: {e}")
 
 # -----------------------------------------------------------------
 # 4. 导入模块
@@ -48,7 +62,7 @@ except ImportError:
 try:
     from main import create_epub, create_epub_from_chapters
     from config import Config
-    from chapter_parser import parse_chapters_from_content
+    from chapter_parser import parse_chapters_from_content, read_text_file
 except ImportError as e:
     logger.error(f"导入主模块失败: {e}")
     send("小说转换任务 - 启动失败", f"导入主模块失败: {e}")
@@ -57,106 +71,153 @@ except ImportError as e:
 # -----------------------------------------------------------------
 # 5. (新增) 文件夹合并 与 MTime 检查逻辑
 # -----------------------------------------------------------------
-def get_source_mtime(task_path, task_type):
+COVER_EXTENSIONS = ('.jpg', '.png', '.jpeg')  # 同名封面有多个时按此顺序优先
+_TXT_EXTS = frozenset({'.txt'})
+_IMG_EXTS = frozenset(COVER_EXTENSIONS)
+
+def _lower_ext(name):
+    """(新增) 返回小写扩展名，用于不区分大小写的类型判断"""
+    return os.path.splitext(name)[1].lower()
+
+def _iter_txt_entries(folder_path):
+    """
+    (新增)
+    遍历文件夹下的 .txt 文件 (扩展名不区分大小写，忽略隐藏文件)
+    返回 os.DirEntry，其 stat() 结果会被缓存，调用方无需再次 stat
+    """
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if _lower_ext(entry.name) in _TXT_EXTS and not entry.name.startswith('.') and entry.is_file():
+                yield entry
+
+def get_entry_mtime(entry):
     """
     (新增)
-    获取单个文件或文件夹中最新文件的修改时间
+    获取目录项的修改时间，失败时返回 0
     """
     try:
-        if task_type == 'single':
-            return os.path.getmtime(task_path)
+        return entry.stat().st_mtime
+    except OSError as e:
+        logger.warning(f"无法获取文件修改时间 {entry.path}: {e}")
+        return 0
 
-        elif task_type == 'folder':
-            txt_files = glob.glob(os.path.join(task_path, '*.txt'))
-            if not txt_files:
-                return 0 # 文件夹为空
+def scan_folder_sources(folder_path):
+    """
+    (新增)
+    扫描文件夹中的 .txt 文件，返回按修改时间排序 (旧->新) 的 [(路径, mtime)]
+    最后一项即为文件夹的最新修改时间，供 mtime 检查和合并共用，无需重复扫描
+    """
+    files_with_mtime = []
+    try:
+        for entry in _iter_txt_entries(folder_path):
+            try:
+                files_with_mtime.append((entry.path, entry.stat().st_mtime))
+            except OSError:
+                logger.warning(f"无法获取文件修改时间: {entry.path}，跳过此文件。")
+    except OSError as e:
+        logger.warning(f"无法读取文件夹 {folder_path}: {e}")
+
+    files_with_mtime.sort(key=lambda x: x[1])
+    return files_with_mtime
 
-            latest_mtime = 0
-            for f in txt_files:
-                mtime = os.path.getmtime(f)
-                if mtime > latest_mtime:
-                    latest_mtime = mtime
-            return latest_mtime
+FOLDER_READ_WORKERS = 8  # 合并文件夹时并行读取/解析的最大线程数
 
+def _read_and_parse(txt_file):
+    """
+    (新增)
+    读取并解析单个 .txt 文件，返回 [(标题, 正文)] 列表 (失败时返回空列表)
+    """
+    logger.debug("正在读取: %s", os.path.basename(txt_file))
+    try:
+        content = read_text_file(txt_file)
+        return parse_chapters_from_content(content, Config)
     except Exception as e:
-        logger.warning(f"无法获取文件修改时间 {task_path}: {e}")
-        return 0
+        logger.error(f"处理文件 {txt_file} 失败: {e}", exc_info=True)
+        return []
 
-def merge_chapters_from_folder(folder_path):
+def merge_chapters_from_folder(folder_path, files_with_mtime=None):
     """
-    (保持)
+    (修改)
     从文件夹中合并章节，并根据修改时间去重。
+    files_with_mtime: scan_folder_sources 的结果；未传入时重新扫描
     """
     logger.info(f"开始合并文件夹: {folder_path}")
 
-    txt_files = glob.glob(os.path.join(folder_path, '*.txt'))
-    if not txt_files:
+    if files_with_mtime is None:
+        files_with_mtime = scan_folder_sources(folder_path)
+    if not files_with_mtime:
         logger.warning("文件夹为空，跳过。")
         return []
 
-    files_with_mtime = []
-    for f in txt_files:
-        try:
-            files_with_mtime.append((f, os.path.getmtime(f)))
-        except OSError:
-            logger.warning(f"无法获取文件修改时间: {f}，跳过此文件。")
-
-    files_with_mtime.sort(key=lambda x: x[1])
     sorted_files = [f[0] for f in files_with_mtime]
 
     logger.info(f"将按以下顺序合并（旧->新）：{', '.join([os.path.basename(f) for f in sorted_files])}")
 
+    # 标题 -> 正文 (dict 保持插入顺序：章节位置由首次出现决定，内容以最新文件为准)
     all_chapters = {}
-    final_chapter_order = []
-
-    for txt_file in sorted_files:
-        logger.debug(f"正在读取: {os.path.basename(txt_file)}")
-        try:
-            from chapter_parser import detect_file_encoding
-            encoding = detect_file_encoding(txt_file)
-
-            with open(txt_file, 'r', encoding=encoding, errors='ignore') as f:
-                content = f.read()
-
-            chapters_list = parse_chapters_from_content(content, Config)
-
-            # (修正) 合并逻辑
-            for chapter_string in chapters_list:
-                lines = chapter_string.split('\n')
-                title = lines[0] if lines else "未知章节"
-                chapter_content = '\n'.join(lines[1:]) if len(lines) > 1 else ""
-
-                if title not in all_chapters:
-                    final_chapter_order.append(title)
 
+    def merge(results):
+        # (修正) 合并逻辑：逐个文件合并，被新文件覆盖的章节随即释放
+        for chapters_list in results:
+            for title, chapter_content in chapters_list:
                 all_chapters[title] = chapter_content
 
-        except Exception as e:
-            logger.error(f"处理文件 {txt_file} 失败: {e}", exc_info=True)
+    # (修改) 多个文件时用线程池重叠文件读取；map 按提交顺序返回，保持 旧->新 顺序
+    max_workers = min(FOLDER_READ_WORKERS, len(sorted_files))
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            merge(executor.map(_read_and_parse, sorted_files))
+    else:
+        merge(_read_and_parse(txt_file) for txt_file in sorted_files)
 
-    # 组装回 epub_builder 期望的格式 (字符串列表)
-    merged_chapters_list = []
-    for title in final_chapter_order:
-        merged_chapters_list.append(f"{title}\n{all_chapters[title]}")
+    # (修改) 直接输出 epub_builder 接受的 [(标题, 正文)] 列表
+    merged_chapters_list = list(all_chapters.items())
 
     logger.info(f"合并完成，共 {len(merged_chapters_list)} 个独立章节。")
     return merged_chapters_list
 
 
-def find_matching_cover(cover_dir, book_name):
-    """(保持) 匹配封面"""
+def build_cover_index(cover_dir):
+    """
+    (新增)
+    扫描一次封面目录，建立 {书名: 封面路径} 索引 (扩展名不区分大小写)
+    """
+    cover_index = {}
     if not cover_dir:
-        return None
-    for ext in ['.jpg', '.png', '.jpeg']:
-        cover_path = os.path.join(cover_dir, f"{book_name}{ext}")
-        if os.path.exists(cover_path):
-            logger.info(f"找到匹配封面: {cover_path}")
-            return cover_path
-    logger.info(f"未找到 {book_name} 的匹配封面。")
-    return None
+        return cover_index
+
+    best_rank = {}
+    try:
+        with os.scandir(cover_dir) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                ext = ext.lower()
+                if ext not in _IMG_EXTS or not entry.is_file():
+                    continue
+                rank = COVER_EXTENSIONS.index(ext)
+                if rank < best_rank.get(stem, len(COVER_EXTENSIONS)):
+                    best_rank[stem] = rank
+                    cover_index[stem] = entry.path
+    except OSError as e:
+        logger.warning(f"无法读取封面目录 {cover_dir}: {e}")
+
+    logger.info(f"封面目录中共找到 {len(cover_index)} 张封面。")
+    return cover_index
+
+def find_matching_cover(cover_index, book_name):
+    """(修改) 从封面索引中匹配封面"""
+    cover_path = cover_index.get(book_name)
+    if cover_path:
+        logger.info(f"找到匹配封面: {cover_path}")
+    else:
+        logger.info(f"未找到 {book_name} 的匹配封面。")
+    return cover_path
 
 def load_metadata(metadata_path):
-    """(保持) 加载 metadata.json"""
+    """
+    (修改) 加载 metadata.json
+    优先使用 orjson 解析 (未安装时使用标准库 json)
+    """
     if not metadata_path:
         logger.info("未配置 METADATA_FILE_PATH，跳过加载自定义元数据。")
         return {}
@@ -164,18 +225,99 @@ def load_metadata(metadata_path):
         logger.warning(f"元数据文件不存在: {metadata_path}，跳过加载。")
         return {}
     try:
-        with open(metadata_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            logger.info(f"成功从 {metadata_path} 加载 {len(data)} 条元数据记录。")
-            return data
+        with open(metadata_path, 'rb') as f:
+            raw = f.read()
+        if raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]  # orjson 不接受 BOM (如记事本保存的文件)
+        data = orjson.loads(raw) if orjson else json.loads(raw.decode('utf-8'))
+
+        if not isinstance(data, dict):
+            logger.warning(f"元数据文件格式不支持 (应为以书名为键的对象): {metadata_path}，跳过加载。")
+            return {}
+
+        logger.info(f"成功从 {metadata_path} 加载 {len(data)} 条元数据记录。")
+        return data
     except Exception as e:
         logger.error(f"读取元数据文件失败: {e}", exc_info=True)
         return {}
 
 
+def convert_task(task, book_meta, cover_path, global_author):
+    """
+    (新增)
+    转换单本书籍 (由 main_entry 调用，可在子进程中运行)
+    返回 (书名, 错误信息)，成功时错误信息为 None
+    """
+    book_name = task['book_name']
+    try:
+        task_type = task['type']
+        task_path = task['path']
+        output_path = task['output_path']
+
+        logger.info(f"正在处理: {book_name} (类型: {task_type})")
+
+        # 获取元数据
+        author = book_meta.get('author', global_author)
+        description = book_meta.get('description', None)
+        logger.info(f"  > 作者: {author}")
+
+        # 根据任务类型调用不同函数
+        if task_type == 'single':
+            create_epub(
+                txt_file=task_path,
+                cover_image=cover_path,
+                title=book_name,
+                author=author,
+                output_path=output_path,
+                description=description
+            )
+
+        elif task_type == 'folder':
+            merged_chapters = merge_chapters_from_folder(task_path, task['files'])
+
+            create_epub_from_chapters(
+                chapters_list=merged_chapters,
+                cover_image=cover_path,
+                title=book_name,
+                author=author,
+                output_path=output_path,
+                description=description
+            )
+
+        return book_name, None
+
+    except Exception as e:
+        logger.error(f"处理 {book_name} 时发生未捕获的异常！")
+        logger.error(f"错误详情: {e}", exc_info=True)
+        return book_name, str(e)
+
+
 # -----------------------------------------------------------------
 # 6. (修改) 重写 main_entry
 # -----------------------------------------------------------------
+NOTIFY_LIST_LIMIT = 20  # 通知中每个列表最多列出的书名数量
+
+class BoundedList:
+    """
+    (新增)
+    只保留前 NOTIFY_LIST_LIMIT 个元素的列表
+    (汇总列表只用于通知展示，无需保存全部书名；总数见汇总中的 processed/failed/skipped)
+    """
+    __slots__ = ('head',)
+
+    def __init__(self):
+        self.head = []
+
+    def append(self, item):
+        if len(self.head) < NOTIFY_LIST_LIMIT:
+            self.head.append(item)
+
+    def __iter__(self):
+        return iter(self.head)
+
+    def __getitem__(self, index):
+        return self.head[index]
+
 def main_entry():
     """
     (修改)
@@ -195,50 +337,62 @@ def main_entry():
     logger.info(f"输出目录 (EPUB): {output_dir}")
 
     metadata_lookup = load_metadata(metadata_path)
+    cover_index = build_cover_index(cover_dir)
 
     # 2. 扫描任务 (文件和文件夹)
+    # (修改) 使用 os.scandir，直接复用目录项自带的类型信息，无需逐个 stat
+    tasks = []
     try:
-        items = os.listdir(input_dir)
+        with os.scandir(input_dir) as entries:
+            for entry in entries:
+                # (修改) 扫描时一并记录源文件修改时间 (mtime 为 0 表示为空或不可读)
+                stem, ext = os.path.splitext(entry.name)
+                if ext.lower() in _TXT_EXTS and entry.is_file():
+                    book_name = stem
+                    tasks.append({'type': 'single', 'book_name': book_name, 'path': entry.path,
+                                  'mtime': get_entry_mtime(entry)})
+                elif entry.is_dir():
+                    book_name = entry.name
+                    files_with_mtime = scan_folder_sources(entry.path)
+                    tasks.append({'type': 'folder', 'book_name': book_name, 'path': entry.path,
+                                  'files': files_with_mtime,
+                                  'mtime': files_with_mtime[-1][1] if files_with_mtime else 0})
     except FileNotFoundError:
         logger.error(f"输入目录不存在: {input_dir}")
-        return {'total': 0, 'processed': 0, 'failed': 0, 'skipped': 0, 'success_list': [], 'failure_list': [], 'skipped_list': []}
-
-    tasks = []
-    for item_name in items:
-        item_path = os.path.join(input_dir, item_name)
-
-        if item_name.endswith('.txt') and os.path.isfile(item_path):
-            book_name = os.path.splitext(item_name)[0]
-            tasks.append({'type': 'single', 'book_name': book_name, 'path': item_path})
-        elif os.path.isdir(item_path):
-            book_name = item_name
-            tasks.append({'type': 'folder', 'book_name': book_name, 'path': item_path})
+        return {'total': 0, 'processed': 0, 'failed': 0, 'skipped': 0, 'interrupted': 0, 'success_list': BoundedList(), 'failure_list': BoundedList(), 'skipped_list': BoundedList(), 'interrupted_list': BoundedList()}
 
     if not tasks:
         logger.warning(f"在 {input_dir} 中未找到任何 .txt 文件或书籍文件夹。任务结束。")
-        return {'total': 0, 'processed': 0, 'failed': 0, 'skipped': 0, 'success_list': [], 'failure_list': [], 'skipped_list': []}
+        return {'total': 0, 'processed': 0, 'failed': 0, 'skipped': 0, 'interrupted': 0, 'success_list': BoundedList(), 'failure_list': BoundedList(), 'skipped_list': BoundedList(), 'interrupted_list': BoundedList()}
 
     logger.info(f"扫描到 {len(tasks)} 个任务 (书籍)，开始处理...")
 
     processed_count = 0
     failed_count = 0
     skipped_count = 0 # (新增)
-    success_list = []
-    failure_list = []
-    skipped_list = [] # (新增)
-
-    # 3. 循环处理任务
+    success_list = BoundedList()
+    failure_list = BoundedList()
+    skipped_list = BoundedList() # (新增)
+    interrupted_count = 0 # (新增) 因进程池中断而未完成的书籍
+    interrupted_list = BoundedList()
+
+    # 3. 检查文件更新时间，筛选出需要转换的任务
+    pending_tasks = []
+    pending_outputs = {}  # (新增) 输出路径 -> 书名，避免两个进程同时写同一个 .epub
     for task in tasks:
-        book_name = ""
+        book_name = task['book_name']
         try:
-            book_name = task['book_name']
-            task_type = task['type']
-            task_path = task['path']
-
             output_path = os.path.join(output_dir, f"{book_name}.epub")
+            task['output_path'] = output_path
+
+            if output_path in pending_outputs:
+                logger.warning(f"未转换 {book_name} ({task['path']}): 与 {pending_outputs[output_path]} 输出到同一个文件 {output_path}。")
+                failed_count += 1
+                failure_list.append(f"{book_name}: 与 {os.path.basename(pending_outputs[output_path])} 输出文件重复，未转换")
+                continue
 
             # --- (新增) 检查文件更新时间 ---
-            source_mtime = get_source_mtime(task_path, task_type)
+            source_mtime = task['mtime']
 
             if source_mtime == 0:
                 logger.warning(f"跳过 {book_name}: 源文件/文件夹为空或不可读。")
@@ -246,8 +400,13 @@ def main_entry():
                 skipped_list.append(f"{book_name} (源文件为空)")
                 continue
 
-            if os.path.exists(output_path):
-                epub_mtime = os.path.getmtime(output_path)
+            # (修改) 一次 stat 同时得到 "是否存在" 和修改时间
+            try:
+                epub_mtime = os.stat(output_path).st_mtime
+            except FileNotFoundError:
+                epub_mtime = None
+
+            if epub_mtime is not None:
                 # 如果源文件 *不比* epub 新，则跳过
                 if source_mtime <= epub_mtime:
                     logger.info(f"跳过 {book_name}: .epub 文件已是最新。")
@@ -260,42 +419,8 @@ def main_entry():
                 logger.info(f"{book_name}.epub 不存在，准备生成...")
             # --- 结束检查 ---
 
-            logger.info(f"--- ( 任务 {processed_count + failed_count + skipped_count + 1} / {len(tasks)} ) ---")
-            logger.info(f"正在处理: {book_name} (类型: {task_type})")
-
-            # 4. 获取元数据
-            book_meta = metadata_lookup.get(book_name, {})
-            author = book_meta.get('author', global_author)
-            description = book_meta.get('description', None)
-            logger.info(f"  > 作者: {author}")
-
-            cover_path = find_matching_cover(cover_dir, book_name)
-
-            # 5. 根据任务类型调用不同函数
-            if task_type == 'single':
-                create_epub(
-                    txt_file=task_path,
-                    cover_image=cover_path,
-                    title=book_name,
-                    author=author,
-                    output_path=output_path,
-                    description=description
-                )
-
-            elif task_type == 'folder':
-                merged_chapters = merge_chapters_from_folder(task_path)
-
-                create_epub_from_chapters(
-                    chapters_list=merged_chapters,
-                    cover_image=cover_path,
-                    title=book_name,
-                    author=author,
-                    output_path=output_path,
-                    description=description
-                )
-
-            processed_count += 1
-            success_list.append(book_name)
+            pending_tasks.append(task)
+            pending_outputs[output_path] = task['path']
 
         except Exception as e:
             logger.error(f"处理 {book_name} 时发生未捕获的异常！")
@@ -303,9 +428,54 @@ def main_entry():
             failed_count += 1
             failure_list.append(f"{book_name}: {str(e)}")
 
+    # 4. (修改) 转换书籍：多本时使用进程池并行处理
+    max_workers = min(Config.get_max_workers(), len(pending_tasks))
+    if pending_tasks:
+        logger.info(f"共 {len(pending_tasks)} 本需要转换，并行进程数: {max_workers}")
+
+    def submit_args(task):
+        book_name = task['book_name']
+        return (task, metadata_lookup.get(book_name, {}), find_matching_cover(cover_index, book_name), global_author)
+
+    def iter_results():
+        # 每本书完成后立即产出结果，进度日志无需等待全部完成
+        nonlocal interrupted_count
+        if max_workers > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(convert_task, *submit_args(task)): task['book_name'] for task in pending_tasks}
+                for future in as_completed(futures):
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        # 某个子进程被杀死 (如内存不足) 后，进程池中尚未完成的书都会收到此异常，
+                        # 无法确定是哪一本导致的：记为未完成，下次运行时会重新转换
+                        interrupted_list.append(futures[future])
+                        interrupted_count += 1
+                    except Exception as e:
+                        # 子进程异常退出等无法在 convert_task 内部捕获的错误
+                        logger.error(f"处理 {futures[future]} 的子进程异常: {e}", exc_info=True)
+                        yield futures[future], str(e)
+        else:
+            for task in pending_tasks:
+                yield convert_task(*submit_args(task))
+
+    completed_count = 0
+    for book_name, error in iter_results():
+        completed_count += 1
+        if error is None:
+            processed_count += 1
+            success_list.append(book_name)
+        else:
+            failed_count += 1
+            failure_list.append(f"{book_name}: {error}")
+        logger.info(f"--- ( 已完成 {completed_count} / {len(pending_tasks)} ) {book_name} ---")
+
+    if interrupted_count:
+        logger.warning(f"转换进程异常退出 (可能是内存不足)，{interrupted_count} 本未完成，下次运行时将重新转换。可调低 MAX_WORKERS。")
+
     logger.info("="*30)
     logger.info("批量小说转换任务执行完毕")
-    logger.info(f"总数: {len(tasks)}, 成功: {processed_count}, 失败: {failed_count}, 跳过: {skipped_count}")
+    logger.info(f"总数: {len(tasks)}, 成功: {processed_count}, 失败: {failed_count}, 跳过: {skipped_count}, 未完成: {interrupted_count}")
     logger.info("="*30)
 
     return {
@@ -313,14 +483,28 @@ def main_entry():
         'processed': processed_count,
         'failed': failed_count,
         'skipped': skipped_count,
+        'interrupted': interrupted_count,
         'success_list': success_list,
         'failure_list': failure_list,
-        'skipped_list': skipped_list
+        'skipped_list': skipped_list,
+        'interrupted_list': interrupted_list
     }
 
 # -----------------------------------------------------------------
 # 7. (修改) 主执行逻辑 (通知部分)
 # -----------------------------------------------------------------
+def format_name_list(names, total):
+    """
+    (新增)
+    将书名列表格式化为通知文本，最多列出 NOTIFY_LIST_LIMIT 条，其余以 "...等 K 本" 概括
+    """
+    shown = names[:NOTIFY_LIST_LIMIT]
+    text = "\n".join(shown)
+    if total > len(shown):
+        text += f"\n...等 {total - len(shown)} 本"
+    return text
+
+
 if __name__ == "__main__":
     notification_title = "小说转换"
 
@@ -332,49 +516,54 @@ if __name__ == "__main__":
 
         summary = main_entry()
 
-        # (修改) 构建通知内容
-        content = ""
+        # (修改) 构建通知内容 (各段落收集到列表中，最后统一拼接)
+        sections = []
 
         # 1. 成功列表
         if summary['processed'] > 0:
-            content += "转换成功：\n"
-            content += "\n".join(summary['success_list'])
+            sections.append("转换成功：\n" + format_name_list(summary['success_list'], summary['processed']))
 
         # 2. 跳过列表 (新增)
         if summary['skipped'] > 0:
-            if content: content += "\n\n"
-            content += "跳过 (已是最新)：\n"
             # (优化：只显示部分跳过)
             if summary['skipped'] > 10:
-                 content += f"{summary['skipped_list'][0]}, {summary['skipped_list'][1]}... (共 {summary['skipped']} 本)"
+                 skipped_text = f"{summary['skipped_list'][0]}, {summary['skipped_list'][1]}... (共 {summary['skipped']} 本)"
             else:
-                 content += "\n".join(summary['skipped_list'])
+                 skipped_text = "\n".join(summary['skipped_list'])
+            sections.append("跳过 (已是最新)：\n" + skipped_text)
 
         # 3. 失败列表
         if summary['failed'] > 0:
-            if content: content += "\n\n"
-            content += "转换失败：\n"
-            content += "\n".join(summary['failure_list'])
+            sections.append("转换失败：\n" + format_name_list(summary['failure_list'], summary['failed']))
+
+        # 3.1 (新增) 未完成列表 (转换进程异常退出)
+        if summary['interrupted'] > 0:
+            sections.append("未完成 (转换进程异常退出，下次运行时重试)：\n" + format_name_list(summary['interrupted_list'], summary['interrupted']))
 
         # 4. 处理 "什么都没发生" 的情况
-        if summary['processed'] == 0 and summary['failed'] == 0:
+        if summary['processed'] == 0 and summary['failed'] == 0 and summary['interrupted'] == 0:
             if summary['total'] == 0:
-                 content = "未找到待转换的 .txt 文件或书籍文件夹。\n"
+                 sections = ["未找到待转换的 .txt 文件或书籍文件夹。\n"]
             elif summary['skipped'] > 0:
-                 # 此时 content 已经包含了跳过列表
-                 content += "\n\n(所有文件均已是最新)"
+                 # 此时 sections 已经包含了跳过列表
+                 sections.append("(所有文件均已是最新)")
             else:
-                 content = "任务执行，但未处理任何文件。\n" # 理论上不会发生
+                 sections = ["任务执行，但未处理任何文件。\n"] # 理论上不会发生
 
         # 5. 摘要
-        content += f"\n\n--- 摘要 ---\n"
-        content += f"总数: {summary['total']}, 成功: {summary['processed']}, 失败: {summary['failed']}, 跳过: {summary['skipped']}"
+        sections.append(
+            "--- 摘要 ---\n"
+            f"总数: {summary['total']}, 成功: {summary['processed']}, 失败: {summary['failed']}, 跳过: {summary['skipped']}, 未完成: {summary['interrupted']}"
+        )
+        content = "\n\n".join(sections)
 
         # 6. 标题
         if summary['processed'] > 0:
              notification_title += " - 转换成功"
         elif summary['failed'] > 0:
              notification_title += " - 转换失败"
+        elif summary['interrupted'] > 0:
+             notification_title += " - 未完成"
         elif summary['skipped'] > 0 and summary['processed'] == 0 and summary['failed'] == 0:
              notification_title += " - 全部跳过"
         elif summary['total'] == 0:
@@ -388,7 +577,9 @@ if __name__ == "__main__":
         logger.error("脚本执行过程中发生未捕获的全局异常！")
         logger.error(f"错误详情: {e}", exc_info=True)
 
-        error_message = f"任务发生致命错误，已中断：\n{e}\n\n{traceback.format_exc()}"
+        # 只格式化最近的若干帧，通知内容最终也会被截断到 1000 字符
+        tb_str = ''.join(traceback.format_exception(type(e), e, e.__traceback__, limit=-8))
+        error_message = f"任务发生致命错误，已中断：\n{e}\n\n{tb_str}"
         if len(error_message) > 1000:
             error_message = error_message[:1000] + "..."
 
@@ -1,115 +1,168 @@
 # src/chapter_parser.py (修改后的完整文件)
 # (已支持 CHAPTER_DETECTION_METHOD)
 
+import codecs
 import re
-import chardet
 from config import Config
 from QL_logger import logger # 导入青龙日志
 
+# 编码检测库: 优先使用更快的 charset-normalizer，未安装时回退到 chardet
+try:
+    from charset_normalizer import from_bytes as charset_from_bytes
+except ImportError:
+    charset_from_bytes = None
+    import chardet
+
+# --- 中文数字字符集 ---
+CHINESE_NUM_CHARS = r'〇一二两三四五六七八九十百千万亿零壹贰叁肆伍陸柒捌玖拾佰仟'
+
+# --- 章节标题规则 (模块加载时合并并预编译为一个正则) ---
+_CHAPTER_TITLE_PATTERNS = [
+    # 规则2: 通用数字+章/节格式 (支持任意数字)
+    r'^第\s*\d+\s*章(?!\S)',                 # 第1章
+    r'^第\s*\d+\s*节(?!\S)',                 # 第1节
+    r'^Chapter\s*\d+(?!\S)',                # Chapter 1
+    r'^Section\s*\d+(?!\S)',                # Section 1
+    r'^第\s*[' + CHINESE_NUM_CHARS + r']+\s*章(?!\S)',
+    r'^第\s*[' + CHINESE_NUM_CHARS + r']+\s*节(?!\S)',
+
+    # 规则3: 通用中文章节标识 (支持任意中文数字)
+    r'^第[' + CHINESE_NUM_CHARS + r']+章(?!\S)',
+    r'^第[' + CHINESE_NUM_CHARS + r']+节(?!\S)',
+    r'^第[' + CHINESE_NUM_CHARS + r']+部(?!\S)',
+
+    # 规则4: 英文章节标识 (支持罗马数字和阿拉伯数字)
+    r'^Chapter\s+[IVX]+(?!\S)',  # Chapter I
+    r'^Section\s+[IVX]+(?!\S)',  # Section I
+    r'^Chapter\s+\d+(?!\S)',     # Chapter 1
+    r'^Section\s+\d+(?!\S)',     # Section 1
+
+    # 规则5: 其他常见格式
+    r'^\d+\s*[\.、](?!\S)',
+    r'^[' + CHINESE_NUM_CHARS + r']+\s*[\.、](?!\S)',
+]
+
+# 规则3/5 中不含字母，统一使用 IGNORECASE 不会改变其匹配结果
+_CHAPTER_TITLE_RE = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in _CHAPTER_TITLE_PATTERNS),
+    re.IGNORECASE
+)
+
+# --- 整篇文本扫描用的正则 (parse_chapters_from_content) ---
+# 统一换行符为 '\n' (行边界与 str.splitlines 一致)
+_LINE_BREAK_RE = re.compile(r'\r\n?|[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]')
+
+# 去掉每一行的首尾空白 (等价于逐行 strip)
+_LINE_EDGE_WS_RE = re.compile(r'^[^\S\n]+|[^\S\n]+$', re.MULTILINE)
+
+# 多行模式下的标题行: 规则1 (#/@) + 规则2-5，其中 \s 限定为不跨行的空白
+_CHAPTER_LINE_RE = re.compile(
+    r'^(?:[#@]|' + '|'.join(
+        '(?:' + pattern[1:].replace(r'\s', r'[^\S\n]') + ')'
+        for pattern in _CHAPTER_TITLE_PATTERNS
+    ) + ')',
+    re.MULTILINE | re.IGNORECASE
+)
+
+# 连续两个及以上的空行 (即连续 3 个以上的 '\n')
+_DOUBLE_EMPTY_LINE_RE = re.compile(r'\n{3,}')
+
 def is_chapter_title(line):
     """
     检查是否为章节标题，支持多种格式
-    (此函数保持原样，包含我们所有的强化规则)
+    (规则见 _CHAPTER_TITLE_PATTERNS，已合并为一个预编译正则)
     """
     line = line.strip()
 
-    # --- 中文数字字符集 ---
-    chinese_num_chars = r'〇一二两三四五六七八九十百千万亿零壹贰叁肆伍陸柒捌玖拾佰仟'
-
     # 规则1: 特殊字符标记 (最高优先级)
-    if line.startswith('#') or line.startswith('##') or line.startswith('@'):
+    if line.startswith('#') or line.startswith('@'):
         return True, line.lstrip('#@').strip()
 
-    # 规则2: 通用数字+章/节格式 (支持任意数字)
-    patterns = [
-        r'^第\s*\d+\s*章(?!\S)',                 # 第1章
-        r'^第\s*\d+\s*节(?!\S)',                 # 第1节
-        r'^Chapter\s*\d+(?!\S)',                # Chapter 1
-        r'^Section\s*\d+(?!\S)',                # Section 1
-        r'^第\s*[' + chinese_num_chars + r']+\s*章(?!\S)',
-        r'^第\s*[' + chinese_num_chars + r']+\s*节(?!\S)',
-    ]
-
-    for pattern in patterns:
-        match = re.match(pattern, line, re.IGNORECASE)
-        if match:
-            return True, line
-
-    # 规则3: 通用中文章节标识 (支持任意中文数字)
-    chinese_patterns = [
-        r'^第[' + chinese_num_chars + r']+章(?!\S)',
-        r'^第[' + chinese_num_chars + r']+节(?!\S)',
-        r'^第[' + chinese_num_chars + r']+部(?!\S)',
-    ]
-
-    for pattern in chinese_patterns:
-        match = re.match(pattern, line)
-        if match:
-            return True, line
+    # 规则2-5: 一次匹配所有标题格式
+    if _CHAPTER_TITLE_RE.match(line):
+        return True, line
 
-    # 规则4: 英文章节标识 (支持罗马数字和阿拉伯数字)
-    english_patterns = [
-        r'^Chapter\s+[IVX]+(?!\S)',  # Chapter I
-        r'^Section\s+[IVX]+(?!\S)',  # Section I
-        r'^Chapter\s+\d+(?!\S)',     # Chapter 1
-        r'^Section\s+\d+(?!\S)',     # Section 1
-    ]
-
-    for pattern in english_patterns:
-        match = re.match(pattern, line, re.IGNORECASE)
-        if match:
-            return True, line
+    return False, line
 
-    # 规则5: 其他常见格式
-    other_patterns = [
-        r'^\d+\s*[\.、](?!\S)',
-        r'^[' + chinese_num_chars + r']+\s*[\.、](?!\S)',
-    ]
+# --- 编码检测 ---
+ENCODING_SAMPLE_SIZE = 64 * 1024  # 编码检测读取的字节数
 
-    for pattern in other_patterns:
-        match = re.match(pattern, line)
-        if match:
-            return True, line
+# UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头，必须先于 UTF-16 检查
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
 
-    return False, line
+def _can_decode(raw_data, encoding):
+    """样本能否按指定编码解码 (允许末尾被截断的多字节字符)"""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(raw_data, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
 
 def detect_file_encoding(txt_file):
-    """检测文件编码 (此函数保持原样)"""
+    """
+    检测文件编码
+    依次检查 BOM 和 UTF-8，都不符合时才调用编码检测库
+    """
     logger.info(f"开始检测文件编码: {txt_file}")
     try:
         with open(txt_file, 'rb') as f:
-            raw_data = f.read(50000)
+            raw_data = f.read(ENCODING_SAMPLE_SIZE)
+
+        for bom, encoding in _BOM_ENCODINGS:
+            if raw_data.startswith(bom):
+                logger.info(f"检测到 BOM，编码: {encoding}")
+                return encoding
+
+        # 纯 ASCII 是 UTF-8 的子集，bytes.isascii 比试解码更快
+        if raw_data.isascii() or _can_decode(raw_data, 'utf-8'):
+            logger.info("检测到编码: utf-8")
+            return 'utf-8'
+
+        # 其余编码交给检测库判断 (Big5/Shift_JIS/EUC-KR 等字节序列也能按 GB18030 解码，不能试解码)
+        if charset_from_bytes is not None:
+            best_match = charset_from_bytes(raw_data).best()
+            encoding = best_match.encoding if best_match else None
+            logger.info(f"检测到编码: {encoding}")
+        else:
             result = chardet.detect(raw_data)
             encoding = result['encoding']
             confidence = result['confidence']
             logger.info(f"检测到编码: {encoding} (置信度: {confidence})")
 
-            if encoding == 'GB2312':
-                logger.warning("编码检测为 GB2312，自动修正为 GBK。")
-                encoding = 'GBK'
+        if not encoding:
+            logger.warning("无法确定文件编码，使用 utf-8。")
+            return 'utf-8'
 
-            return encoding
+        if encoding.lower() == 'gb2312':
+            logger.warning("编码检测为 GB2312，自动修正为 GBK。")
+            encoding = 'GBK'
+
+        return encoding
 
     except Exception as e:
         logger.error(f"无法检测文件编码: {e}", exc_info=True)
         return 'utf-8'
 
-def add_chapter_marker_to_line(line, chapter_marker):
-    """为行添加章节标记 (此函数保持原样)"""
-    if not line.startswith(chapter_marker):
-        return f"{chapter_marker}{line}"
-    return line
-
 # --- (修改) 核心解析逻辑 (已支持 DETECTION_METHOD) ---
 def parse_chapters_from_content(content_string, config):
     """
     (修改) 从字符串内容中解析章节
     config: 传入 Config 类的引用
+    返回 [(标题, 正文)] 列表，正文各行以 '\n' 分隔
+
+    整篇文本只做几次正则扫描：先统一换行并去除行首尾空白，
+    再用 finditer 定位所有标题行并按位置切片，最后按双空行拆分。
+    结果与逐行处理完全一致：
+      - 章节内的单个空行保留为段落分隔，章节开头的空行被丢弃；
+      - 双空行分割时，前一章末尾保留一个空行，其后的空行被丢弃。
     """
     chapters = []
-    chapter = []
-    chapter_count = 0
-    empty_line_count = 0
 
     # --- (修改) 获取所有相关配置 ---
     detection_method = config.get_chapter_detection_method()
@@ -121,63 +174,60 @@ def parse_chapters_from_content(content_string, config):
     logger.info(f"启用双空行检测: {enable_double_empty_line}")
     logger.info(f"启用章节标记: {enable_chapter_marker}")
 
+    # 只有 auto 和 pattern_only 模式才执行标题匹配
+    match_titles = detection_method in ('auto', 'pattern_only')
+    # 'pattern_only' 模式下，空行仅用于格式化，绝不用于分割
+    split_on_empty = enable_double_empty_line and detection_method != 'pattern_only'
+
     try:
-        lines = content_string.splitlines()
-        for line in lines:
-            line = line.strip()
-
-            if line:  # 非空行
-                empty_line_count = 0
-
-                # --- (修改) 章节标题匹配逻辑 ---
-                is_chapter = False
-                if detection_method in ['auto', 'pattern_only']:
-                    # 只有 auto 和 pattern_only 模式才执行标题匹配
-                    is_chapter, chapter_title_line = is_chapter_title(line)
-                else:
-                    # (detection_method == 'double_empty_line_only')
-                    # 强制所有行都为内容，不执行标题匹配
-                    chapter_title_line = line
-                # --- 结束修改 ---
-
-                if is_chapter:
-                    final_title = chapter_title_line
-                    if enable_chapter_marker:
-                        final_title = add_chapter_marker_to_line(final_title, chapter_marker)
-
-                    if chapter:
-                        chapters.append('\n'.join(chapter))
-                        chapter_count += 1
-
-                    chapter = [final_title] # 开始新章节
-
-                else:
-                    # 普通内容行
-                    chapter.append(line)
-            else:  # 空行
-                empty_line_count += 1
-
-                # --- (修改) 空行分割逻辑 ---
-                if detection_method == 'pattern_only':
-                    # 'pattern_only' 模式下，空行仅用于格式化，绝不用于分割
-                    if chapter:
-                        chapter.append('')  # 保持段落
-                    continue # 跳过下面的分割逻辑
-
-                # (适用于 'auto' 和 'double_empty_line_only' 模式)
-                if enable_double_empty_line and empty_line_count == 2 and chapter:
-                    chapters.append('\n'.join(chapter))
-                    chapter_count += 1
-                    chapter = []
-                    empty_line_count = 0
-                elif chapter:
-                    chapter.append('')  # 保持段落
-                # --- 结束修改 ---
-
-        # 添加最后一章
-        if chapter:
-            chapters.append('\n'.join(chapter))
-            chapter_count += 1
+        text = _LINE_BREAK_RE.sub('\n', content_string)
+        if text and not text.endswith('\n'):
+            text += '\n'  # 保证每一行都以 '\n' 结尾
+        text = _LINE_EDGE_WS_RE.sub('', text)
+
+        # 1. 按标题行切分为若干块: (是否以标题开头, 块文本)
+        blocks = []
+        block_start = 0
+        title = None
+        if match_titles:
+            for match in _CHAPTER_LINE_RE.finditer(text):
+                title_start = match.start()
+                if title is not None:
+                    blocks.append((True, title + text[block_start:title_start]))
+                elif title_start > 0:
+                    blocks.append((False, text[:title_start]))
+
+                title_end = text.index('\n', title_start)
+                title = text[title_start:title_end]
+                if title[0] in '#@':
+                    title = title.lstrip('#@').strip()
+                if enable_chapter_marker and not title.startswith(chapter_marker):
+                    title = chapter_marker + title  # 添加章节标记 (已有标记则保持原样)
+                title += '\n'
+                block_start = title_end + 1
+
+        if title is not None:
+            blocks.append((True, title + text[block_start:]))
+        elif text:
+            blocks.append((False, text))
+
+        # 2. 按双空行拆分每一块，并拆分为 (标题, 正文)
+        for starts_with_title, block in blocks:
+            pieces = _DOUBLE_EMPTY_LINE_RE.split(block) if split_on_empty else [block]
+            last_index = len(pieces) - 1
+            for i, piece in enumerate(pieces):
+                if not (starts_with_title and i == 0):
+                    piece = piece.lstrip('\n')  # 丢弃章节开头的空行
+                    if not piece:
+                        continue
+
+                if i < last_index:
+                    piece += '\n'  # 双空行分割处，保留一个空行
+                elif piece.endswith('\n'):
+                    piece = piece[:-1]  # 去掉最后一行的换行符
+                # 首行为标题，其余为正文 (无换行时正文为空)
+                title, _, body = piece.partition('\n')
+                chapters.append((title, body))
 
     except Exception as e:
         logger.error(f"解析内容时发生错误: {e}", exc_info=True)
@@ -185,16 +235,25 @@ def parse_chapters_from_content(content_string, config):
 
     return chapters
 
+def read_text_file(txt_file):
+    """
+    (新增)
+    检测编码并读取整个文本文件
+    一次读取全部字节再整体解码，省去文本模式逐块解码和换行转换
+    (BOM 由 utf-8-sig / utf-16 解码器去除，换行符由解析器统一)
+    """
+    encoding = detect_file_encoding(txt_file)
+    with open(txt_file, 'rb') as f:
+        return f.read().decode(encoding, errors='ignore')
+
 # --- (修改) 重构 parse_chapters_from_file ---
 def parse_chapters_from_file(txt_file):
     """
     (修改) 从TXT文件中解析章节。
     此函数现在只负责读取文件，然后调用 parse_chapters_from_content
     """
-    encoding = detect_file_encoding(txt_file)
     try:
-        with open(txt_file, 'r', encoding=encoding, errors='ignore') as f:
-            content = f.read()
+        content = read_text_file(txt_file)
 
         # (修改) 传入 Config 类本身
         chapters = parse_chapters_from_content(content, Config)
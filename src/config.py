@@ -1,57 +1,91 @@
 # src/config.py (修改后的完整文件)
 
+import functools
 import os
 from QL_logger import logger # 导入日志
 
+# 默认并行进程数上限：每个进程都持有一整本解码后的书，容器内存有限
+DEFAULT_MAX_WORKERS_CAP = 4
+
+def _available_cpus():
+    """本进程可用的 CPU 数 (sched_getaffinity 会考虑 cpuset 限制，os.cpu_count 只返回宿主机核数)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # 非 Linux 平台
+        return os.cpu_count() or 1
+
 class Config:
-    """配置类，管理所有配置参数"""
+    """
+    配置类，管理所有配置参数
+    (修改) 环境变量在任务运行期间不会变化，各 getter 首次读取后即缓存结果
+    """
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_input_dir():
         """获取 TXT 文件输入目录"""
         return os.getenv('INPUT_DIR')
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_output_dir():
         """获取 EPUB 文件输出目录"""
         return os.getenv('OUTPUT_DIR')
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_cover_dir():
         """获取封面图片目录 (可选)"""
         return os.getenv('COVER_DIR')
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_global_author():
         """获取全局作者信息 (可选)"""
         return os.getenv('AUTHOR', 'Unknown Author')
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_metadata_file_path():
         """获取元数据 JSON 文件的路径 (可选)"""
         return os.getenv('METADATA_FILE_PATH')
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_chapter_detection_method():
         """获取章节检测方法"""
         method = os.getenv('CHAPTER_DETECTION_METHOD', 'auto')
         return method.lower()
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def enable_double_empty_line_detection():
         """是否启用双空行分章检测"""
         return os.getenv('ENABLE_DOUBLE_EMPTY_LINE', 'true').lower() == 'true'
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def enable_chapter_marker():
         """是否启用章节标记功能（在双空行分章时添加特殊字符）"""
         return os.getenv('ENABLE_CHAPTER_MARKER', 'false').lower() == 'true'
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_chapter_marker():
         """获取章节标记字符"""
         return os.getenv('CHAPTER_MARKER', '#')
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_max_workers():
+        """获取并行转换书籍的最大进程数 (默认为可用 CPU 数，最多 DEFAULT_MAX_WORKERS_CAP；设为 1 则逐本处理)"""
+        default_workers = min(DEFAULT_MAX_WORKERS_CAP, _available_cpus())
+        try:
+            return max(1, int(os.getenv('MAX_WORKERS', default_workers)))
+        except ValueError:
+            logger.warning(f"MAX_WORKERS 不是有效的整数，使用默认值: {default_workers}")
+            return default_workers
+
     @staticmethod
     def validate_config():
         """验证配置是否完整"""
@@ -1,9 +1,40 @@
 # src/epub_builder.py (修改后的完整文件)
 
 from ebooklib import epub
+import html
 import os
+import zipfile
 from QL_logger import logger
 
+# 小于该字节数的条目直接存储 (ZIP_STORED)，省去为每个小文件初始化 zlib 的开销
+ZIP_STORE_THRESHOLD = 1024
+
+# 其余条目的 DEFLATE 压缩级别：1 最快，中文 XHTML 体积只比默认级别 (6) 略大
+ZIP_COMPRESS_LEVEL = 1
+
+class _EpubZipFile(zipfile.ZipFile):
+    """按条目大小选择压缩方式的 ZipFile：小文件存储，其余使用 DEFLATE"""
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None, compresslevel=None):
+        size = len(data.encode('utf-8')) if isinstance(data, str) else len(data)  # ZipFile 按 UTF-8 编码 str
+        if compress_type is None and size < ZIP_STORE_THRESHOLD:
+            compress_type = zipfile.ZIP_STORED
+        super().writestr(zinfo_or_arcname, data, compress_type=compress_type, compresslevel=compresslevel)
+
+class _EpubWriter(epub.EpubWriter):
+    """与 ebooklib 的 EpubWriter 相同，仅替换底层的 ZipFile"""
+
+    def write(self):
+        self.out = _EpubZipFile(self.file_name, 'w', zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESS_LEVEL)
+        # mimetype 必须是第一个且不压缩的条目 (EPUB 规范)
+        self.out.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+
+        self._write_container()
+        self._write_opf()
+        self._write_items()
+
+        self.out.close()
+
 def setup_book_metadata(book, title, author):
     """设置EPUB书籍的元数据"""
     book.set_title(title)
@@ -29,26 +60,32 @@ def add_cover_image(book, cover_image):
         logger.error(f"无法读取或添加封面图片: {e}", exc_info=True)
 
 def create_chapter_items(book, chapters):
-    """创建章节项目并添加到书籍中"""
+    """
+    创建章节项目并添加到书籍中
+    chapters: [(标题, 正文)] 列表，正文各行以 '\n' 分隔
+    """
     logger.info("开始创建 EPUB 章节内容...")
     toc = []
+    escape = html.escape
 
-    for i, chapter_text in enumerate(chapters):
-        lines = chapter_text.split('\n')
-        chapter_title = lines[0] if lines else f'第{i + 1}章'
-        chapter_content_lines = lines[1:] if len(lines) > 1 else ['']
+    for i, (chapter_title, chapter_body) in enumerate(chapters):
+        chapter_content_lines = chapter_body.split('\n')
 
-        paragraphs = []
+        # 正文按纯文本处理，转义 < > & 以免破坏 XHTML 结构
+        # (修改) 标题和各段落的片段收集到同一个列表，最后一次性拼接
+        parts = ['<h1>', escape(chapter_title, quote=False), '</h1>']
+        append = parts.append
         for line in chapter_content_lines:
             if line:
-                paragraphs.append(f"<p>{line}</p>")
+                append('<p>')
+                append(escape(line, quote=False))
+                append('</p>\n')
             else:
-                paragraphs.append("<p>&nbsp;</p>")
-
-        formatted_content = "\n".join(paragraphs)
+                append('<p>&nbsp;</p>\n')
+        parts[-1] = parts[-1][:-1]  # 最后一段之后不换行
 
         chapter_item = epub.EpubHtml(title=chapter_title, file_name=f'chapter_{i + 1}.xhtml', lang='zh')
-        chapter_item.set_content(f'<h1>{chapter_title}</h1>{formatted_content}')
+        chapter_item.set_content(''.join(parts))
 
         book.add_item(chapter_item)
         book.spine.append(chapter_item) # (注意) 这里会追加到 book.spine
@@ -63,7 +100,9 @@ def save_epub_file(book, output_path):
     output_filename = output_path
 
     try:
-        epub.write_epub(output_filename, book, {})
+        writer = _EpubWriter(output_filename, book, {})
+        writer.process()
+        writer.write()
         logger.info(f"EPUB文件已成功保存: {os.path.abspath(output_filename)}")
         return True
     except Exception as e:
@@ -90,8 +129,8 @@ def create_epub_book(chapters, title, author, cover_image=None, description=None
 
         # 创建一个简介页面
         desc_page = epub.EpubHtml(title='简介', file_name='desc.xhtml', lang='zh')
-        # 将换行符转为 <br> 以保留格式
-        desc_html = description.replace('\n', '<br/>\n')
+        # 转义后将换行符转为 <br> 以保留格式
+        desc_html = html.escape(description, quote=False).replace('\n', '<br/>\n')
         desc_page.set_content(f'<h1>简介</h1><p>{desc_html}</p>')
         book.add_item(desc_page)
 